@@ -0,0 +1,150 @@
+"""
+Compare the single-process API with the front-end workers + inference process
+deployment, using stub pipelines so it runs on a CPU-only box.
+
+The stub pipelines skip inference (optionally sleeping to mimic it), so the
+numbers show how much HTTP handling and image codec work (multipart parsing,
+PNG decode, resize, PNG/base64 encode) limits throughput in each mode.
+
+Usage:
+    python benchmark_workers.py --workers 4 --concurrency 8 --requests 64
+"""
+import os
+import io
+import sys
+import json
+import time
+import uuid
+import argparse
+import secrets
+import tempfile
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def make_png(size: tuple) -> bytes:
+    """Noisy RGB PNG so decode and encode cost roughly what a photo would"""
+    bands = [Image.effect_noise(size, 64) for _ in range(3)]
+    buffer = io.BytesIO()
+    Image.merge("RGB", bands).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def encode_multipart(fields: dict, files: dict) -> tuple:
+    """Build a multipart/form-data body for urllib"""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode())
+    for name, data in files.items():
+        body.write(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{name}.png\"\r\n"
+            f"Content-Type: image/png\r\n\r\n".encode()
+        )
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+def wait_for_health(port: int, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=2) as response:
+                if json.load(response)["status"] == "ok":
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API on port {port} did not become healthy")
+
+def run_load(port: int, body: bytes, content_type: str, requests: int, concurrency: int) -> dict:
+    def send(_):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/inpaint",
+            data=body,
+            headers={"Content-Type": content_type}
+        )
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=300) as response:
+            json.load(response)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "throughput": requests / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    }
+
+def run_config(name: str, workers: int, split: bool, args, body: bytes, content_type: str) -> dict:
+    env = dict(
+        os.environ,
+        INFERENCE_STUB="1",
+        INFERENCE_STUB_DELAY=str(args.stub_delay),
+        API_PORT=str(args.port),
+        API_WORKERS=str(workers)
+    )
+    env.pop("INFERENCE_SOCKET", None)
+
+    with tempfile.TemporaryDirectory() as socket_dir:
+        if split:
+            env["INFERENCE_SOCKET"] = os.path.join(socket_dir, "inference.sock")
+            env["INFERENCE_AUTHKEY"] = secrets.token_hex(16)
+        return _run_processes(name, split, env, args, body, content_type)
+
+def _run_processes(name: str, split: bool, env: dict, args, body: bytes, content_type: str) -> dict:
+    processes = []
+    output = open(os.devnull, "w")
+    try:
+        if split:
+            processes.append(subprocess.Popen(
+                [sys.executable, "inference_server.py"], cwd=BACKEND_DIR, env=env, stdout=output, stderr=output
+            ))
+        processes.append(subprocess.Popen(
+            [sys.executable, "main.py"], cwd=BACKEND_DIR, env=env, stdout=output, stderr=output
+        ))
+
+        wait_for_health(args.port)
+        run_load(args.port, body, content_type, args.concurrency, args.concurrency)  # Warm-up
+        result = run_load(args.port, body, content_type, args.requests, args.concurrency)
+        print(
+            f"   {name:<34} {result['throughput']:7.2f} req/s | "
+            f"p50 {result['p50'] * 1000:7.0f}ms | p95 {result['p95'] * 1000:7.0f}ms"
+        )
+        return result
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+        output.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="front-end workers in split mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent client requests")
+    parser.add_argument("--requests", type=int, default=64, help="measured requests per configuration")
+    parser.add_argument("--stub-delay", type=float, default=0.0, help="seconds each stub inference sleeps")
+    parser.add_argument("--image-size", type=int, nargs=2, default=[1536, 1024], help="upload width height")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    print("🧪 Front-end worker benchmark (stub pipelines)")
+    print(f"   📋 {args.requests} x /inpaint | concurrency {args.concurrency} | "
+          f"upload {args.image_size[0]}x{args.image_size[1]} | stub delay {args.stub_delay}s")
+    print("")
+
+    image = make_png(tuple(args.image_size))
+    body, content_type = encode_multipart({"prompt": "benchmark"}, {"image": image, "mask": image})
+
+    run_config("single process (1 worker)", 1, False, args, body, content_type)
+    run_config(f"split ({args.workers} front-ends + inference)", args.workers, True, args, body, content_type)
+
+if __name__ == "__main__":
+    main()
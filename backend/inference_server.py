@@ -0,0 +1,316 @@
+"""
+Single model-owning inference process for multi-worker deployments.
+
+Running uvicorn with several workers would load RealVisXL once per worker.
+Instead, this process loads the pipelines once and serves any number of
+lightweight front-end workers (main.py with INFERENCE_SOCKET set), which keep
+multipart parsing, PIL decode/resize and PNG/base64 encode to themselves.
+
+Per request only a small control message travels over a Unix socket. Decoded
+pixel buffers and the result image are exchanged through a shared memory
+segment owned by each front-end worker, so pixel data is never pickled or
+copied through the socket.
+
+Control messages are pickled, so both sides must share a random
+INFERENCE_AUTHKEY and the socket is only accessible to its owner.
+
+Usage:
+    export INFERENCE_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(16))")
+    INFERENCE_SOCKET=/tmp/ai-image-editor.sock python inference_server.py
+    INFERENCE_SOCKET=/tmp/ai-image-editor.sock API_WORKERS=4 python main.py
+"""
+import os
+import sys
+import time
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from types import SimpleNamespace
+from PIL import Image
+
+DEFAULT_SOCKET = "/tmp/ai-image-editor-inference.sock"
+INFERENCE_AUTHKEY = os.environ.get("INFERENCE_AUTHKEY", "")  # Random secret, no default
+
+# Shared memory segments grow in steps of this size to avoid frequent resizes
+SEGMENT_STEP = 8 * 1024 * 1024
+
+def get_authkey() -> bytes:
+    """Shared secret for the control socket; refuses to run without one"""
+    if not INFERENCE_AUTHKEY:
+        raise RuntimeError("INFERENCE_AUTHKEY must be set to a random secret shared with the inference process")
+    return INFERENCE_AUTHKEY.encode()
+
+def attach_segment(name: str) -> shared_memory.SharedMemory:
+    """Attach to a segment owned by a front-end worker without taking ownership"""
+    segment = shared_memory.SharedMemory(name=name)
+    # Attaching registers the segment with this process's resource tracker,
+    # which would unlink it on exit. The front-end worker owns its lifetime.
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+class InferenceServer:
+    """Owns the pipelines and runs requests from front-end workers one at a time"""
+
+    def __init__(self, address: str, pipelines: dict, startup_info: dict, get_gpu_memory_info, cleanup_gpu_memory):
+        self.address = address
+        self.pipelines = pipelines
+        self.startup_info = startup_info
+        self.get_gpu_memory_info = get_gpu_memory_info
+        self.cleanup_gpu_memory = cleanup_gpu_memory
+        self.lock = threading.Lock()  # Single GPU: one inference at a time
+
+    def serve_forever(self):
+        """Accept front-end connections, one handler thread per worker"""
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+        # Owner-only socket: other local users cannot even attempt the handshake
+        old_umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family="AF_UNIX", authkey=get_authkey())
+        finally:
+            os.umask(old_umask)
+
+        with listener:
+            print(f"🔌 Inference process listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"⚠️  Rejected front-end connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        segment = None
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    break
+
+                try:
+                    if message["op"] == "status":
+                        reply = {
+                            "ok": True,
+                            "gpu_memory": self.get_gpu_memory_info(),
+                            "startup": self.startup_info
+                        }
+                    else:
+                        # Workers replace their segment when it needs to grow
+                        if segment is None or segment.name != message["shm"]:
+                            if segment is not None:
+                                segment.close()
+                            segment = attach_segment(message["shm"])
+                        reply = self._run(segment, message)
+                except Exception as e:
+                    print(f"❌ Error during inference: {e}")
+                    reply = {"ok": False, "error": str(e)}
+
+                conn.send(reply)
+        finally:
+            conn.close()
+            if segment is not None:
+                segment.close()
+
+    def _run(self, segment: shared_memory.SharedMemory, message: dict) -> dict:
+        pipe = self.pipelines[message["pipeline"]]
+
+        images = {}
+        for key, (offset, length, mode, size) in message["images"].items():
+            with segment.buf[offset:offset + length] as view:
+                images[key] = Image.frombytes(mode, size, view)
+
+        start_time = time.time()
+        with self.lock:
+            result = pipe(**images, **message["kwargs"]).images[0]
+            self.cleanup_gpu_memory()
+        processing_time = round(time.time() - start_time, 2)
+        print(f"⚙️  {message['pipeline']} finished in {processing_time}s")
+
+        if result.mode != "RGB":
+            result = result.convert("RGB")
+        data = result.tobytes()
+
+        reply = {
+            "ok": True,
+            "mode": result.mode,
+            "size": result.size,
+            "gpu_memory": self.get_gpu_memory_info()
+        }
+
+        offset, capacity = message["output"]
+        if len(data) <= capacity:
+            segment.buf[offset:offset + len(data)] = data
+            reply["offset"] = offset
+            reply["length"] = len(data)
+        else:
+            # Unexpected output size: fall back to sending the pixels inline
+            reply["data"] = data
+        return reply
+
+class InferenceClient:
+    """Connection from a front-end worker to the inference process"""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.conn = None
+        self.segment = None
+        self.lock = threading.Lock()
+        self.last_gpu_memory = None
+        self.startup_info = {}
+
+    def connect(self, timeout: float = 0.0):
+        """Connect to the inference process, waiting up to `timeout` seconds for it to come up"""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                self.conn = Client(self.address, family="AF_UNIX", authkey=get_authkey())
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.time() >= deadline:
+                    raise
+                time.sleep(1)
+        self.startup_info = self._request({"op": "status"})["startup"]
+
+    def close(self):
+        """Close the connection and release this worker's shared memory"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+    def gpu_memory_info(self) -> dict:
+        """GPU memory as last reported by the inference process"""
+        if self.last_gpu_memory is None:
+            with self.lock:
+                self._request({"op": "status"})
+        return self.last_gpu_memory
+
+    def is_alive(self) -> bool:
+        """Whether the inference process answers a status round-trip
+
+        A request already in flight holds the lock for the whole inference, so
+        it counts as alive rather than making health checks wait for it.
+        """
+        if not self.lock.acquire(blocking=False):
+            return self.conn is not None
+        try:
+            self._request({"op": "status"})
+            return True
+        except Exception:
+            return False
+        finally:
+            self.lock.release()
+
+    def _request(self, message: dict) -> dict:
+        if self.conn is None:
+            self.connect()
+        try:
+            self.conn.send(message)
+            reply = self.conn.recv()
+        except (EOFError, OSError):
+            # Inference process went away; reconnect on the next request
+            self.conn.close()
+            self.conn = None
+            raise RuntimeError("Lost connection to inference process")
+
+        if "gpu_memory" in reply:
+            self.last_gpu_memory = reply["gpu_memory"]
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def _reserve(self, nbytes: int) -> shared_memory.SharedMemory:
+        if self.segment is None or self.segment.size < nbytes:
+            if self.segment is not None:
+                self.segment.close()
+                self.segment.unlink()
+            size = -(-nbytes // SEGMENT_STEP) * SEGMENT_STEP
+            self.segment = shared_memory.SharedMemory(create=True, size=size)
+        return self.segment
+
+    def run(self, pipeline: str, images: dict, output_size: tuple, **kwargs) -> Image.Image:
+        """Run `pipeline` on the inference process and return the result image"""
+        with self.lock:
+            buffers = {key: (image.mode, image.size, image.tobytes()) for key, image in images.items()}
+            output_bytes = output_size[0] * output_size[1] * 3
+            segment = self._reserve(sum(len(data) for _, _, data in buffers.values()) + output_bytes)
+
+            # Layout: input images back to back, then room for the RGB result
+            layout = {}
+            offset = 0
+            for key, (mode, size, data) in buffers.items():
+                segment.buf[offset:offset + len(data)] = data
+                layout[key] = (offset, len(data), mode, size)
+                offset += len(data)
+            del buffers
+
+            reply = self._request({
+                "op": "run",
+                "pipeline": pipeline,
+                "shm": segment.name,
+                "images": layout,
+                "output": (offset, output_bytes),
+                "kwargs": kwargs
+            })
+
+            if "data" in reply:
+                return Image.frombytes(reply["mode"], reply["size"], reply["data"])
+            start = reply["offset"]
+            with segment.buf[start:start + reply["length"]] as view:
+                return Image.frombytes(reply["mode"], reply["size"], view)
+
+class RemotePipeline:
+    """Drop-in stand-in for a diffusers pipeline that runs on the inference process"""
+
+    def __init__(self, client: InferenceClient, name: str):
+        self.client = client
+        self.name = name
+
+    def __call__(self, image=None, mask_image=None, **kwargs):
+        images = {}
+        if image is not None:
+            images["image"] = image
+        if mask_image is not None:
+            images["mask_image"] = mask_image
+
+        # Inpainting keeps the input size; generation uses the requested size
+        if image is not None:
+            output_size = image.size
+        else:
+            output_size = (kwargs.get("width", 1024), kwargs.get("height", 1024))
+
+        result = self.client.run(self.name, images, output_size, **kwargs)
+        return SimpleNamespace(images=[result])
+
+def serve():
+    """Load the pipelines once and serve front-end workers"""
+    import main as api
+
+    if not INFERENCE_AUTHKEY:
+        sys.exit("❌ Set INFERENCE_AUTHKEY to a random secret (run.sh generates one per launch)")
+
+    address = os.environ.get("INFERENCE_SOCKET") or DEFAULT_SOCKET
+
+    print("\n🚀 Starting AI Image Editor inference process...")
+    api.log_gpu_memory("STARTUP - Before model loading")
+    pipe_inpaint, pipe_generate = api.load_pipelines()
+    api.log_gpu_memory("STARTUP - After model loading")
+    print("🎉 RealVisXL models loaded successfully!")
+
+    server = InferenceServer(
+        address,
+        {"inpaint": pipe_inpaint, "generate": pipe_generate},
+        api.startup_info,
+        api.get_gpu_memory_info,
+        api.cleanup_gpu_memory
+    )
+    server.serve_forever()
+
+if __name__ == "__main__":
+    serve()
@@ -1,16 +1,17 @@
 import os
 import io
-import torch
 import time
 import gc
+import threading
 from datetime import datetime
+from types import SimpleNamespace
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from PIL import Image
 import base64
 from typing import Optional
-from diffusers import AutoPipelineForInpainting, StableDiffusionXLPipeline
 
 app = FastAPI(title="AI Image Editor API", version="2.0.0")
 
@@ -30,6 +31,20 @@ app.add_middleware(
 # Global pipeline variables
 pipe_inpaint = None  # For inpainting and erasing
 pipe_generate = None  # For text-to-image generation
+inference_client = None  # Set when pipelines live in a separate inference process
+startup_info = {}  # How and how fast the pipelines were loaded
+pipeline_lock = threading.Lock()  # One inference at a time per process
+
+# Deployment settings
+MODEL_NAME = "SG161222/RealVisXL_V5.0"
+MODEL_DTYPE = "float16"  # torch dtype the pipelines run in; snapshots must match
+API_PORT = int(os.environ.get("API_PORT", "8000"))
+API_WORKERS = int(os.environ.get("API_WORKERS", "1"))
+INFERENCE_SOCKET = os.environ.get("INFERENCE_SOCKET", "")  # Front-end mode when set
+INFERENCE_CONNECT_TIMEOUT = float(os.environ.get("INFERENCE_CONNECT_TIMEOUT", "600"))
+INFERENCE_STUB = os.environ.get("INFERENCE_STUB", "0") == "1"  # Skip model loading (benchmarks)
+INFERENCE_STUB_DELAY = float(os.environ.get("INFERENCE_STUB_DELAY", "0"))
+MODEL_SNAPSHOT = os.environ.get("MODEL_SNAPSHOT", "")  # Warm-start from snapshot.py export
 
 # Default prompts for better results
 DEFAULT_INPAINT_PROMPT = "high quality, detailed, photorealistic, natural lighting, sharp focus, professional photography"
@@ -44,6 +59,13 @@ DEFAULT_GENERATE_NEGATIVE = "bad hands, bad anatomy, ugly, deformed, face asymme
 # GPU Memory Monitoring Functions
 def get_gpu_memory_info():
     """Get comprehensive GPU memory information"""
+    if inference_client is not None:
+        # The GPU belongs to the inference process; report what it last saw
+        return inference_client.gpu_memory_info()
+
+    # Imported here so front-end workers never pay for torch
+    import torch
+
     if not torch.cuda.is_available():
         return {
             "cuda_available": False,
@@ -85,8 +107,32 @@ def log_gpu_memory(prefix: str, endpoint: str = ""):
     else:
         print(f"\n💻 [{timestamp}] {prefix} - {endpoint} (CPU Mode)")
 
+def get_process_memory_info():
+    """Get resident memory of this process"""
+    try:
+        import resource
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KB on Linux
+    except ImportError:
+        peak_memory = 0
+
+    try:
+        with open("/proc/self/statm") as f:
+            resident_memory = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        resident_memory = peak_memory
+
+    return {
+        "rss_gb": round(resident_memory / (1024**3), 2),
+        "peak_rss_gb": round(peak_memory / (1024**3), 2)
+    }
+
 def cleanup_gpu_memory():
     """Clean up GPU memory after operations"""
+    if inference_client is not None:
+        return  # The inference process cleans up after each job
+
+    import torch
+
     if torch.cuda.is_available():
         # Clear cache
         torch.cuda.empty_cache()
@@ -122,43 +168,124 @@ async def monitor_gpu_memory(request: Request, call_next):
     
     return response
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the RealVisXL models for all tasks"""
-    global pipe_inpaint, pipe_generate
-    try:
-        print("\n🚀 Starting AI Image Editor API...")
-        log_gpu_memory("STARTUP - Before model loading")
-        
+class StubPipeline:
+    """Stand-in for a diffusers pipeline that skips inference (CPU-only benchmarking)"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def __call__(self, image=None, width: int = 1024, height: int = 1024, **kwargs):
+        time.sleep(self.delay)
+        if image is not None:
+            result = image.copy()
+        else:
+            result = Image.new("RGB", (width, height), (128, 128, 128))
+        return SimpleNamespace(images=[result])
+
+def load_pipelines(use_snapshot: bool = True, move_to_gpu: bool = True):
+    """Load the inpainting and text-to-image pipelines into this process"""
+    global startup_info
+    import torch
+
+    start_time = time.time()
+
+    if INFERENCE_STUB:
+        print(f"🧪 Using stub pipelines (delay: {INFERENCE_STUB_DELAY}s)")
+        inpaint, generate = StubPipeline(INFERENCE_STUB_DELAY), StubPipeline(INFERENCE_STUB_DELAY)
+        source = "stub"
+    elif use_snapshot and MODEL_SNAPSHOT:
+        from snapshot import load_snapshot
+
+        # Memory-mapped weights, no hub lookups
+        print(f"Loading RealVisXL_V5.0 from snapshot {MODEL_SNAPSHOT}...")
+        pipelines = load_snapshot(MODEL_SNAPSHOT, MODEL_NAME, MODEL_DTYPE)
+        inpaint, generate = pipelines["inpaint"], pipelines["generate"]
+        source = "snapshot"
+    else:
+        from diffusers import AutoPipelineForInpainting, StableDiffusionXLPipeline
+
         # Load inpainting pipeline for inpainting and erasing
         print("Loading RealVisXL_V5.0 for inpainting...")
-        pipe_inpaint = AutoPipelineForInpainting.from_pretrained(
-            "SG161222/RealVisXL_V5.0",
-            torch_dtype=torch.float16,
+        inpaint = AutoPipelineForInpainting.from_pretrained(
+            MODEL_NAME,
+            torch_dtype=getattr(torch, MODEL_DTYPE),
             variant="fp16"
         )
-        
+
         # Load text-to-image pipeline for generation
         print("Loading RealVisXL_V5.0 for text-to-image...")
-        pipe_generate = StableDiffusionXLPipeline.from_pretrained(
-            "SG161222/RealVisXL_V5.0",
-            torch_dtype=torch.float16,
+        generate = StableDiffusionXLPipeline.from_pretrained(
+            MODEL_NAME,
+            torch_dtype=getattr(torch, MODEL_DTYPE),
             variant="fp16"
         )
-        
+        source = "hub"
+
+    if source != "stub" and move_to_gpu:
         if torch.cuda.is_available():
-            pipe_inpaint.to("cuda")
-            pipe_generate.to("cuda")
+            inpaint.to("cuda")
+            generate.to("cuda")
             print("✅ RealVisXL models loaded on CUDA")
         else:
             print("⚠️  CUDA not available, using CPU")
-            
+
+    startup_info = {
+        "source": source,
+        "load_seconds": round(time.time() - start_time, 2),
+        **get_process_memory_info()
+    }
+    print(f"⏱️  Pipelines ready in {startup_info['load_seconds']}s from {source} | "
+          f"RSS: {startup_info['rss_gb']:.2f}GB (peak {startup_info['peak_rss_gb']:.2f}GB)")
+
+    return inpaint, generate
+
+def _call_pipeline(pipe, kwargs):
+    with pipeline_lock:
+        return pipe(**kwargs)
+
+async def run_pipeline(pipe, **kwargs):
+    """Run a pipeline off the event loop so the worker keeps serving HTTP meanwhile"""
+    return await run_in_threadpool(_call_pipeline, pipe, kwargs)
+
+@app.on_event("startup")
+async def startup_event():
+    """Initialize the RealVisXL models for all tasks"""
+    global pipe_inpaint, pipe_generate, inference_client
+
+    if INFERENCE_SOCKET:
+        # Front-end worker: HTTP and image codecs here, models in inference_server.py
+        from inference_server import InferenceClient, RemotePipeline
+
+        print(f"\n🚀 Starting AI Image Editor API front-end (pid {os.getpid()})...")
+        try:
+            client = InferenceClient(INFERENCE_SOCKET)
+            client.connect(timeout=INFERENCE_CONNECT_TIMEOUT)
+            inference_client = client
+            pipe_inpaint = RemotePipeline(client, "inpaint")
+            pipe_generate = RemotePipeline(client, "generate")
+            print(f"🔗 Connected to inference process at {INFERENCE_SOCKET}")
+        except Exception as e:
+            print(f"❌ Error connecting to inference process: {e}")
+        return
+
+    try:
+        print("\n🚀 Starting AI Image Editor API...")
+        log_gpu_memory("STARTUP - Before model loading")
+
+        pipe_inpaint, pipe_generate = load_pipelines()
+
         log_gpu_memory("STARTUP - After model loading")
         print("🎉 RealVisXL models loaded successfully!")
         
     except Exception as e:
         print(f"❌ Error loading models: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the shared memory owned by a front-end worker"""
+    if inference_client is not None:
+        inference_client.close()
+
 def image_to_base64(image: Image.Image) -> str:
     """Convert PIL Image to base64 string"""
     buffer = io.BytesIO()
@@ -184,14 +311,20 @@ async def health_check():
     memory_info = get_gpu_memory_info()
     
     models_loaded = pipe_inpaint is not None and pipe_generate is not None
+    if inference_client is not None and not await run_in_threadpool(inference_client.is_alive):
+        # Front-end mode: the models are only usable while the inference process answers
+        status = "inference_unavailable"
+    else:
+        status = "ok" if models_loaded else "models_not_loaded"
     
     return {
-        "status": "ok" if models_loaded else "models_not_loaded",
+        "status": status,
         "inpaint_model_loaded": pipe_inpaint is not None,
         "generate_model_loaded": pipe_generate is not None,
         "model_name": "RealVisXL_V5.0",
-        "cuda_available": torch.cuda.is_available(),
+        "cuda_available": memory_info["cuda_available"],
         "gpu_memory": memory_info,
+        "startup": inference_client.startup_info if inference_client is not None else startup_info,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -249,7 +382,8 @@ async def inpaint_image(
         log_gpu_memory("⚙️  Starting inference", "INPAINT")
         
         # Perform inpainting
-        result = pipe_inpaint(
+        result = (await run_pipeline(
+            pipe_inpaint,
             prompt=enhanced_prompt,
             negative_prompt=negative_prompt,
             image=input_image,
@@ -257,7 +391,7 @@ async def inpaint_image(
             num_inference_steps=num_inference_steps,
             guidance_scale=guidance_scale,
             strength=strength
-        ).images[0]
+        )).images[0]
         
         # Convert result to base64
         result_base64 = image_to_base64(result)
@@ -331,7 +465,8 @@ async def erase_object(
         log_gpu_memory("⚙️  Starting inference", "ERASE")
         
         # Perform object removal
-        result = pipe_inpaint(
+        result = (await run_pipeline(
+            pipe_inpaint,
             prompt=enhanced_prompt,
             negative_prompt=negative_prompt,
             image=input_image,
@@ -339,7 +474,7 @@ async def erase_object(
             num_inference_steps=num_inference_steps,
             guidance_scale=guidance_scale,
             strength=strength
-        ).images[0]
+        )).images[0]
         
         # Convert result to base64
         result_base64 = image_to_base64(result)
@@ -391,14 +526,15 @@ async def generate_image(
         log_gpu_memory("⚙️  Starting inference", "GENERATE")
         
         # Generate image (text-to-image)
-        result = pipe_generate(
+        result = (await run_pipeline(
+            pipe_generate,
             prompt=enhanced_prompt,
             negative_prompt=negative_prompt,
             num_inference_steps=num_inference_steps,
             guidance_scale=guidance_scale,
             width=width,
             height=height
-        ).images[0]
+        )).images[0]
         
         # Convert result to base64
         result_base64 = image_to_base64(result)
@@ -426,4 +562,10 @@ async def generate_image(
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    if API_WORKERS > 1:
+        if not INFERENCE_SOCKET:
+            print("⚠️  Every worker will load its own copy of RealVisXL_V5.0")
+            print("   💡 Start inference_server.py and set INFERENCE_SOCKET to share one copy")
+        uvicorn.run("main:app", host="0.0.0.0", port=API_PORT, workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=API_PORT)
\ No newline at end of file
@@ -123,6 +123,12 @@ def main():
     print(f"   🔧 Config: {MODEL_CONFIG}")
     print("")
     
+    # A warm-start snapshot already holds everything the API loads
+    snapshot = os.environ.get("MODEL_SNAPSHOT", "")
+    if snapshot and os.path.exists(os.path.join(snapshot, "snapshot.json")):
+        print(f"⚡ Pipeline snapshot found at {snapshot}, skipping download and verification")
+        return
+    
     # Check disk space
     if not check_disk_space():
         print("   ⚠️  Proceeding anyway, but monitor disk space...")
@@ -183,6 +189,21 @@ fi
 # Clean up download script
 rm -f download_models.py
 
+# Export a warm-start snapshot once, so later starts skip hub resolution
+if [ -n "$MODEL_SNAPSHOT" ] && [ ! -f "$MODEL_SNAPSHOT/snapshot.json" ]; then
+    echo ""
+    echo "📦 Exporting pipeline snapshot to $MODEL_SNAPSHOT..."
+    if python snapshot.py export "$MODEL_SNAPSHOT"; then
+        echo "✅ Snapshot ready"
+    else
+        echo "⚠️  Snapshot export failed, starting from the hub cache"
+        unset MODEL_SNAPSHOT
+    fi
+fi
+if [ -n "$MODEL_SNAPSHOT" ]; then
+    export MODEL_SNAPSHOT
+fi
+
 echo ""
 echo "🔥 Features Available:"
 echo "   🎨 AI Inpainting - Replace/modify objects in images"
@@ -201,4 +222,19 @@ echo "⏳ Starting FastAPI server..."
 echo "   (Models are pre-downloaded, first request should be fast!)"
 echo ""
 
+# Optional multi-worker mode: HTTP front-end workers share one inference process
+API_WORKERS=${API_WORKERS:-1}
+if [ "$API_WORKERS" -gt 1 ]; then
+    # Private socket directory and a fresh secret for every launch
+    INFERENCE_DIR=$(mktemp -d)
+    export INFERENCE_SOCKET=${INFERENCE_SOCKET:-$INFERENCE_DIR/inference.sock}
+    export INFERENCE_AUTHKEY=$(head -c16 /dev/urandom | od -An -tx1 | tr -d ' \n')
+    echo "🔀 Multi-worker mode: $API_WORKERS front-end workers + 1 inference process"
+    echo "   🔌 Inference socket: $INFERENCE_SOCKET"
+    echo ""
+    python inference_server.py &
+    INFERENCE_PID=$!
+    trap "kill $INFERENCE_PID; rm -rf $INFERENCE_DIR" EXIT
+fi
+
 python main.py
\ No newline at end of file
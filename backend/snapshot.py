@@ -0,0 +1,273 @@
+"""
+Warm-start pipeline snapshots.
+
+Starting from the hub cache means `from_pretrained` resolution, per-component
+safetensors loading and module construction for every pipeline, which takes
+tens of seconds before the API can take traffic. A snapshot is a local
+directory with everything the loaded pipelines need:
+
+    snapshot.json       pipeline classes and configs, dtype, tensor index
+    weights.bin         every module's weights in one file, already in the selected dtype
+    modules/<name>/     module configs
+    <pipeline>/<name>/  tokenizers and scheduler configs
+
+Modules shared by the inpainting and text-to-image pipelines are stored once
+and shared again after loading. Loading builds each module with empty weights
+and points its parameters at slices of the memory-mapped weights.bin, so
+pages are read lazily and nothing goes through the hub.
+
+Usage:
+    python snapshot.py export ./snapshots/realvisxl
+    MODEL_SNAPSHOT=./snapshots/realvisxl python main.py
+    python snapshot.py compare ./snapshots/realvisxl
+"""
+import os
+import sys
+import json
+import math
+import mmap
+import argparse
+import importlib
+import subprocess
+import torch
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = "snapshot.json"
+WEIGHTS_NAME = "weights.bin"
+
+# Tensor offsets in weights.bin are aligned so every dtype can be viewed in place
+ALIGNMENT = 64
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _import_class(entry: dict):
+    return getattr(importlib.import_module(entry["library"]), entry["class"])
+
+def _describe(component) -> dict:
+    component_type = type(component)
+    return {"library": component_type.__module__.split(".")[0], "class": component_type.__name__}
+
+def _module_config(module: torch.nn.Module) -> dict:
+    if hasattr(module, "save_config"):
+        return dict(module.config)  # diffusers
+    return module.config.to_dict()  # transformers
+
+def _same_module(a: torch.nn.Module, b: torch.nn.Module) -> bool:
+    """Whether two modules have the same class, config and weights"""
+    if type(a) is not type(b) or _module_config(a) != _module_config(b):
+        return False
+    state_a, state_b = a.state_dict(), b.state_dict()
+    if state_a.keys() != state_b.keys():
+        return False
+    return all(
+        state_a[key].shape == state_b[key].shape
+        and state_a[key].dtype == state_b[key].dtype
+        and torch.equal(state_a[key], state_b[key].to(state_a[key].device))
+        for key in state_a
+    )
+
+def _write_tensor(weights, tensor: torch.Tensor) -> dict:
+    offset = -(-weights.tell() // ALIGNMENT) * ALIGNMENT
+    weights.write(b"\0" * (offset - weights.tell()))
+    data = tensor.detach().to("cpu").contiguous().reshape(-1).view(torch.uint8).numpy()
+    weights.write(data.data)
+    return {
+        "dtype": str(tensor.dtype).replace("torch.", ""),
+        "shape": list(tensor.shape),
+        "offset": offset
+    }
+
+def export_snapshot(pipelines: dict, path: str, model_name: str):
+    """Write loaded pipelines to a snapshot directory at `path`"""
+    os.makedirs(path, exist_ok=True)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "model_name": model_name,
+        "dtype": None,
+        "modules": {},
+        "pipelines": {}
+    }
+    exported = {}  # Module group name -> module already written to weights.bin
+
+    # Drop the old manifest first, so an interrupted re-export never looks like a
+    # valid snapshot pointing into the new files
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # Running servers keep a private mmap of weights.bin; rewriting it in place would
+    # truncate their pages (SIGBUS). Write a new file and swap it in instead.
+    weights_path = os.path.join(path, WEIGHTS_NAME)
+    with open(weights_path + ".tmp", "wb") as weights:
+        for pipeline_name, pipe in pipelines.items():
+            if manifest["dtype"] is None:
+                manifest["dtype"] = str(pipe.dtype).replace("torch.", "")
+
+            components = {}
+            for name, component in pipe.components.items():
+                if component is None:
+                    components[name] = None
+                    continue
+
+                entry = _describe(component)
+                if isinstance(component, torch.nn.Module):
+                    group = next((group for group, module in exported.items() if _same_module(module, component)), None)
+                    if group is None:
+                        group = name if name not in exported else f"{pipeline_name}_{name}"
+                        print(f"   💾 Writing {group} ({entry['class']})...")
+
+                        config_dir = os.path.join(path, "modules", group)
+                        if hasattr(component, "save_config"):
+                            component.save_config(config_dir)
+                        else:
+                            component.config.save_pretrained(config_dir)
+
+                        manifest["modules"][group] = dict(entry, tensors={
+                            key: _write_tensor(weights, tensor) for key, tensor in component.state_dict().items()
+                        })
+                        exported[group] = component
+                    else:
+                        print(f"   🔗 {pipeline_name}.{name} shares {group}")
+                    entry["module"] = group
+                else:
+                    # Tokenizers and schedulers are small; keep their own files
+                    entry["path"] = os.path.join(pipeline_name, name)
+                    component.save_pretrained(os.path.join(path, entry["path"]))
+                components[name] = entry
+
+            manifest["pipelines"][pipeline_name] = {
+                "class": type(pipe).__name__,
+                "config": {
+                    key: value for key, value in pipe.config.items()
+                    if key not in pipe.components and not key.startswith("_")
+                },
+                "components": components
+            }
+
+    os.replace(weights_path + ".tmp", weights_path)
+
+    # Manifest last, so an interrupted export never looks like a valid snapshot
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+def _load_module(path: str, group: str, entry: dict, weights: mmap.mmap) -> torch.nn.Module:
+    from accelerate import init_empty_weights
+    from accelerate.utils import set_module_tensor_to_device
+
+    cls = _import_class(entry)
+    config_dir = os.path.join(path, "modules", group)
+
+    # Build on the meta device: no time spent allocating or initializing weights
+    with init_empty_weights():
+        if hasattr(cls, "load_config"):
+            module = cls.from_config(cls.load_config(config_dir))
+        else:
+            module = cls(cls.config_class.from_pretrained(config_dir))
+
+    for name, info in entry["tensors"].items():
+        dtype = getattr(torch, info["dtype"])
+        count = math.prod(info["shape"])
+        if count:
+            tensor = torch.frombuffer(weights, dtype=dtype, count=count, offset=info["offset"]).view(info["shape"])
+        else:
+            tensor = torch.empty(info["shape"], dtype=dtype)
+        # Passing the dtype keeps accelerate from converting, so the tensor stays a view of the file
+        set_module_tensor_to_device(module, name, "cpu", value=tensor, dtype=dtype)
+
+    module.eval()
+    return module
+
+def load_snapshot(path: str, model_name: str, dtype: str) -> dict:
+    """Build the pipelines stored in a snapshot, keyed by pipeline name
+
+    `model_name` and `dtype` (a torch dtype name, e.g. "float16") are what the
+    caller expects; a snapshot exported for anything else is rejected.
+    """
+    import diffusers
+
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest["format"] != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest['format']} (expected {SNAPSHOT_FORMAT})")
+    if manifest["model_name"] != model_name:
+        raise ValueError(f"Snapshot was exported from {manifest['model_name']}, expected {model_name}; export it again")
+    if manifest["dtype"] != dtype:
+        raise ValueError(f"Snapshot was exported as {manifest['dtype']}, expected {dtype}; export it again")
+
+    # Private copy-on-write mapping: pages load on first touch and the file is never modified
+    with open(os.path.join(path, WEIGHTS_NAME), "rb") as f:
+        weights = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    modules = {
+        group: _load_module(path, group, entry, weights)
+        for group, entry in manifest["modules"].items()
+    }
+
+    pipelines = {}
+    for pipeline_name, entry in manifest["pipelines"].items():
+        components = {}
+        for name, component in entry["components"].items():
+            if component is None:
+                components[name] = None
+            elif "module" in component:
+                components[name] = modules[component["module"]]
+            else:
+                components[name] = _import_class(component).from_pretrained(os.path.join(path, component["path"]))
+        pipelines[pipeline_name] = getattr(diffusers, entry["class"])(**components, **entry["config"])
+    return pipelines
+
+def export(path: str):
+    """Load the pipelines from the hub cache the way the API does and export them"""
+    import main as api
+
+    if api.INFERENCE_STUB:
+        sys.exit("❌ Stub pipelines cannot be exported; unset INFERENCE_STUB")
+
+    print(f"📦 Exporting {api.MODEL_NAME} snapshot to {path}")
+    # Always from the hub cache (MODEL_SNAPSHOT may name the directory being
+    # written), and kept on the CPU since every tensor is written from there
+    pipe_inpaint, pipe_generate = api.load_pipelines(use_snapshot=False, move_to_gpu=False)
+    export_snapshot({"inpaint": pipe_inpaint, "generate": pipe_generate}, path, api.MODEL_NAME)
+
+    size_gb = os.path.getsize(os.path.join(path, WEIGHTS_NAME)) / (1024**3)
+    print(f"🎉 Snapshot written ({size_gb:.2f}GB of weights)")
+    print(f"   🚀 Start the API with: MODEL_SNAPSHOT={path} python main.py")
+
+def compare(path: str):
+    """Load the pipelines from the hub cache and from the snapshot, each in a fresh process"""
+    code = "import json, main; main.load_pipelines(); print(json.dumps(main.startup_info))"
+
+    print("⏱️  Startup comparison (fresh process per path)")
+    for label, snapshot in (("hub cache", ""), ("snapshot", path)):
+        env = dict(os.environ, MODEL_SNAPSHOT=snapshot, INFERENCE_STUB="0")
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            # No stderr usually means the process was killed, e.g. by the OOM killer
+            stderr = result.stderr.strip().splitlines()
+            reason = stderr[-1] if stderr else "no error output"
+            print(f"   ❌ {label}: exit code {result.returncode} ({reason})")
+            continue
+        info = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"   {label:<10} {info['load_seconds']:7.2f}s | "
+            f"RSS: {info['rss_gb']:.2f}GB (peak {info['peak_rss_gb']:.2f}GB)"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("export", help="export the loaded pipelines").add_argument("path")
+    subparsers.add_parser("compare", help="compare startup from the hub cache and a snapshot").add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.path)
+    else:
+        compare(args.path)
+
+if __name__ == "__main__":
+    main()